@@ -3,76 +3,466 @@
 Graph Maker - Generate JPG graphs from InfluxDB data for e-paper display
 """
 
+import csv
+import hashlib
+import io
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
 import yaml
 from datetime import datetime
+import numpy as np
+import pandas as pd
 import pytz
-from influxdb_client import InfluxDBClient
+from influxdb_client import Dialect, InfluxDBClient
+from urllib3 import Retry
+import matplotlib
+matplotlib.use('Agg')  # Headless backend, graphs are only written to files
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from pathlib import Path
+# Load Pillow's JPEG encoder once at startup rather than on the first save
+from PIL import Image, JpegImagePlugin  # noqa: F401
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional, M4 then runs on plain numpy
+    njit = None
+
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as YamlLoader
+
+plt.ioff()
+# DejaVu Sans ships with matplotlib and is the default sans-serif font anyway,
+# naming it directly skips searching the fallback list
+matplotlib.rcParams['font.family'] = 'DejaVu Sans'
+
+# Matches a trailing `|> yield(...)` so it can be moved after our own pipes
+_TRAILING_YIELD_RE = re.compile(r'\|>\s*yield\s*\([^)]*\)\s*$')
+_IMPORT_RE = re.compile(r'^\s*import\s+"[^"]*"\s*$')
+# Matches `range(start: -24h)` style relative ranges, optionally with a
+# relative or now() stop, capturing the start and stop durations
+_RELATIVE_RANGE_RE = re.compile(
+    r'range\(\s*start:\s*-((?:\d+[smhdw])+)\s*'
+    r'(?:,\s*stop:\s*(?:-((?:\d+[smhdw])+)|now\(\s*\))\s*)?\)'
+)
+_DURATION_PART_RE = re.compile(r'(\d+)([smhdw])')
+_DURATION_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+# Query results are read as plain CSV; only the default annotation is kept as
+# it may carry the result name for rows that leave it empty
+CSV_DIALECT = Dialect(header=True, delimiter=',', annotations=['default'],
+                      comment_prefix='#', date_time_format='RFC3339')
+# Number of CSV rows collected before they are converted to arrays
+CSV_BATCH_ROWS = 10000
+_CSV_BOOLEANS = {'true': '1', 'false': '0'}
+
+# Pillow encoder options favouring encode speed over file size (JPEG is
+# written separately, see create_graph)
+PIL_SAVE_OPTIONS = {
+    'png': {'compress_level': 1},
+}
+
+# GraphMaker owned by a generate_all_graphs() worker process
+_worker_graph_maker = None
+
+
+def _m4_kernel(ts_ns, values, n_bins):
+    """Single pass M4 over int64 timestamps, returning the indices to keep"""
+    n = len(ts_ns)
+    out = np.empty(n, dtype=np.int64)
+    count = 0
+    t0 = ts_ns.min()
+    span = max(ts_ns.max() - t0, 1)
+
+    start = 0
+    while start < n:
+        current = min(int((ts_ns[start] - t0) / span * n_bins), n_bins - 1)
+        lo = -1
+        hi = -1
+        end = start
+        while end < n and min(int((ts_ns[end] - t0) / span * n_bins), n_bins - 1) == current:
+            # Skip NaN (null values) like np.fmin/np.fmax do
+            value = values[end]
+            if not np.isnan(value):
+                if lo < 0 or value < values[lo]:
+                    lo = end
+                if hi < 0 or value > values[hi]:
+                    hi = end
+            end += 1
+        if lo < 0:
+            # Only NaN in this bin, keep just its first and last point
+            lo = hi = start
+
+        # Emit first, min/max and last in index order, skipping duplicates
+        for idx in (start, min(lo, hi), max(lo, hi), end - 1):
+            if count == 0 or out[count - 1] != idx:
+                out[count] = idx
+                count += 1
+        start = end
+
+    return out[:count]
+
+
+# The kernel is only worth using once compiled, in plain Python the
+# vectorized numpy version below is faster. No fastmath: it would allow
+# assuming there is no NaN and reordering the bin arithmetic, and the
+# kernel is bound by comparisons anyway.
+_m4_jit = njit(cache=True)(_m4_kernel) if njit else None
+
+
+def _m4_downsample(timestamps, values, n_bins):
+    """Downsample a series with M4 aggregation
+
+    Splits the time range into `n_bins` equal-width bins and keeps the first,
+    last, minimum and maximum point of each bin, which renders identically
+    to the full series when each bin maps to one pixel column.
+    """
+    ts_ns = timestamps.view('i8')
+    if _m4_jit is not None:
+        keep = _m4_jit(ts_ns, values, n_bins)
+        return timestamps[keep], values[keep]
+
+    t0 = ts_ns.min()
+    span = max(int(ts_ns.max() - t0), 1)
+    bins = ((ts_ns - t0) / span * n_bins).astype(np.int64)
+    bins = np.minimum(bins, n_bins - 1)
+
+    # Runs of consecutive points falling into the same bin
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+    counts = np.diff(np.r_[starts, len(bins)])
+    run = np.repeat(np.arange(len(starts)), counts)
+
+    keep = np.zeros(len(values), dtype=bool)
+    keep[starts] = True
+    keep[starts + counts - 1] = True
+    # fmin/fmax skip NaN (null values), so a gap doesn't hide the bin's range
+    for reduce in (np.fmin, np.fmax):
+        extreme = np.repeat(reduce.reduceat(values, starts), counts)
+        idx = np.flatnonzero(values == extreme)
+        # First point reaching the extreme within each run
+        first = np.r_[True, run[idx][1:] != run[idx][:-1]]
+        keep[idx[first]] = True
+
+    return timestamps[keep], values[keep]
+
+
+class SeriesBuffer:
+    """Timestamp and value arrays filled from streamed query rows
+
+    Storage grows geometrically, so each batch of rows is copied in once and
+    the batch itself can be released right away.
+    """
+
+    def __init__(self, capacity=1024):
+        self.times = np.empty(capacity, dtype='datetime64[ns]')
+        self.values = np.empty(capacity, dtype=np.float64)
+        self.size = 0
+
+    def append_csv(self, times, values):
+        """Append RFC3339 timestamp and value strings read from CSV rows"""
+        # InfluxDB writes UTC timestamps with a 'Z' suffix, which numpy only
+        # parses (in C) when it is left off; they are kept naive from here on
+        times = np.array([t[:-1] for t in times], dtype='datetime64[ns]')
+        try:
+            values = np.array(values, dtype=np.float64)
+        except ValueError:
+            # Boolean fields are plotted as 1/0, empty strings (nulls) as NaN
+            values = [_CSV_BOOLEANS.get(value, value) for value in values]
+            values = pd.to_numeric(values, errors='coerce')
+
+        end = self.size + len(times)
+        if end > len(self.times):
+            capacity = max(end, 2 * len(self.times))
+            self.times = self._grow(self.times, capacity)
+            self.values = self._grow(self.values, capacity)
+
+        self.times[self.size:end] = times
+        self.values[self.size:end] = values
+        self.size = end
+
+    def _grow(self, array, capacity):
+        grown = np.empty(capacity, dtype=array.dtype)
+        grown[:self.size] = array[:self.size]
+        return grown
+
+    def arrays(self):
+        """Return the filled part of the timestamp and value arrays"""
+        return self.times[:self.size], self.values[:self.size]
 
 
 class GraphMaker:
     def __init__(self, config_path='config.yaml'):
         """Initialize GraphMaker with configuration file"""
+        self.config_path = config_path
         with open(config_path, 'r') as f:
-            self.config = yaml.safe_load(f)
+            self.config = yaml.load(f, Loader=YamlLoader)
 
         # Timezone used for plotting (defaults to Finland)
         self.tz = pytz.timezone(self.config.get('timezone', 'Europe/Helsinki'))
+        # UTC times at which the timezone changes its offset: none for fixed
+        # offset zones such as UTC, None if they can't be known
+        if isinstance(self.tz, pytz.tzinfo.DstTzInfo):
+            self.tz_transitions = np.array(
+                self.tz._utc_transition_times, dtype='datetime64[us]'
+            )
+        elif isinstance(self.tz, pytz.tzinfo.StaticTzInfo) or self.tz is pytz.utc:
+            self.tz_transitions = np.empty(0, dtype='datetime64[us]')
+        else:
+            self.tz_transitions = None
         
-        # Initialize InfluxDB client
+        # Initialize InfluxDB client. urllib3 keeps connections alive, so size
+        # the pool to keep one per graph and retry failed connection attempts.
+        # Responses are gzipped by default as time series compress well.
         self.client = InfluxDBClient(
             url=self.config['influxdb']['url'],
             token=self.config['influxdb']['token'],
-            org=self.config['influxdb']['org']
+            org=self.config['influxdb']['org'],
+            enable_gzip=self.config['influxdb'].get('enable_gzip', True),
+            connection_pool_maxsize=max(1, len(self.config['graphs'])),
+            retries=Retry(total=self.config['influxdb'].get('retries', 3))
         )
         self.query_api = self.client.query_api()
         
         # Create output directory if it doesn't exist
         output_dir = Path(self.config['output']['directory'])
         output_dir.mkdir(parents=True, exist_ok=True)
+
+        # Compile the M4 kernel up front so the first graph doesn't pay for it
+        if _m4_jit is not None:
+            _m4_jit(np.arange(8, dtype=np.int64), np.zeros(8), 2)
+
+        # One figure is reused for every graph instead of creating a new one
+        self.fig, self.ax = plt.subplots(dpi=self.config['output']['dpi'])
+
+        # Date ticks are the same for every graph, so build them only once
+        self.date_formatter = mdates.DateFormatter('%H:%M')
+        self.date_locator = mdates.HourLocator(interval=4)
+
+        # Draw the empty figure once to load fonts and the renderer up front
+        self.fig.canvas.draw()
     
-    def query_data(self, query):
+    def shape_query(self, query, graph_config=None):
+        """Limit a Flux query to the columns and resolution used for plotting"""
+        # Drop a trailing yield, it would otherwise pass the unshaped stream on
+        query = _TRAILING_YIELD_RE.sub('', query.rstrip()).rstrip()
+
+        every = self.aggregate_every(query, graph_config)
+        if every:
+            query += (f'\n  |> aggregateWindow(every: {every}s, fn: mean, '
+                      f'createEmpty: false, timeSrc: "_start")')
+
+        return f'{query}\n  |> keep(columns: ["_time", "_value"])'
+
+    def aggregate_every(self, query, graph_config):
+        """Return the aggregation window in seconds for a line graph query
+
+        Points closer together than one pixel column are averaged by InfluxDB.
+        Only graphs with `aggregate: true` are aggregated, as `mean` fails on
+        boolean and string fields and would fail the combined query. It also
+        needs a relative `range(start: -<duration>)`, optionally with a
+        relative or now() stop, to know the time span, and is skipped for bar
+        graphs and queries that already aggregate.
+        """
+        if graph_config is None or not graph_config.get('aggregate', False):
+            return None
+        if graph_config.get('graph_type', 'line') == 'bar' or 'aggregateWindow' in query:
+            return None
+
+        match = _RELATIVE_RANGE_RE.search(query)
+        if not match:
+            return None
+        start, stop = match.groups()
+        window_seconds = self.duration_seconds(start) - self.duration_seconds(stop or '')
+        if window_seconds <= 0:
+            return None
+        return max(1, window_seconds // graph_config['size']['width'])
+
+    @staticmethod
+    def duration_seconds(duration):
+        """Convert a Flux duration literal such as `1d12h` to seconds"""
+        return sum(
+            int(amount) * _DURATION_SECONDS[unit]
+            for amount, unit in _DURATION_PART_RE.findall(duration)
+        )
+
+    def query_data(self, query, graph_config=None):
         """Query data from InfluxDB"""
         try:
-            tables = self.query_api.query(query)
-            
-            timestamps = []
-            values = []
-            
-            for table in tables:
-                for record in table.records:
-                    # Convert UTC timestamp to Finland timezone
-                    utc_time = record.get_time()
-                    if utc_time.tzinfo is None:
-                        utc_time = pytz.utc.localize(utc_time)
-                    local_time = utc_time.astimezone(self.tz)
-                    timestamps.append(local_time)
-                    values.append(record.get_value())
-            
-            return timestamps, values
+            buffer = SeriesBuffer()
+            self.read_series(self.shape_query(query, graph_config), {}, default=buffer)
+            return self.to_local(*buffer.arrays())
+        except Exception as e:
+            print(f"Error querying data: {e}")
+            return self.empty_series()
+
+    def query_all(self, graphs):
+        """Query data for all graphs with a single Flux request
+
+        Returns a (timestamps, values) pair per graph, or None if the
+        combined query failed.
+        """
+        # Imports must come first in a Flux script, so hoist them out of the
+        # individual queries and give each query its own named result
+        imports = []
+        blocks = []
+        for i, graph_config in enumerate(graphs):
+            body = []
+            for line in graph_config['query'].splitlines():
+                if _IMPORT_RE.match(line):
+                    if line.strip() not in imports:
+                        imports.append(line.strip())
+                else:
+                    body.append(line)
+            query = self.shape_query('\n'.join(body), graph_config)
+            blocks.append(f'{query}\n  |> yield(name: "graph{i}")')
+
+        buffers = {f'graph{i}': SeriesBuffer() for i in range(len(graphs))}
+        try:
+            self.read_series('\n'.join(imports + blocks), buffers)
         except Exception as e:
             print(f"Error querying data: {e}")
-            return [], []
+            return None
+
+        return [self.to_local(*buffer.arrays()) for buffer in buffers.values()]
+
+    def read_series(self, query, buffers, default=None):
+        """Run a Flux query and fill SeriesBuffers from its CSV response
+
+        Rows go to the buffer in `buffers` named after their result, or to
+        `default` if there is none. Columns are picked by position from each
+        table's header and rows are converted to arrays in batches.
+        """
+        pending = {}
+
+        def flush(name):
+            times, values = pending[name]
+            buffer = buffers.get(name, default)
+            if buffer is not None and times:
+                buffer.append_csv(times, values)
+            times.clear()
+            values.clear()
+
+        response = self.query_api.query_raw(query, dialect=CSV_DIALECT)
+        # Let io.TextIOWrapper see the end of the body instead of a closed file
+        response.auto_close = False
+        try:
+            reader = csv.reader(io.TextIOWrapper(response, encoding='utf-8', newline=''))
+            expect_header = True
+            defaults = []
+            for row in reader:
+                if not row:
+                    # A blank line starts a new table with its own header
+                    expect_header = True
+                    continue
+                if row[0].startswith('#'):
+                    if row[0] == '#default':
+                        defaults = row
+                    continue
+                if expect_header:
+                    expect_header = False
+                    if 'error' in row:
+                        message = next(reader, [])
+                        error_i = row.index('error')
+                        raise RuntimeError(message[error_i] if len(message) > error_i else 'query error')
+                    result_i = row.index('result')
+                    time_i = row.index('_time')
+                    value_i = row.index('_value')
+                    default_result = defaults[result_i] if len(defaults) > result_i else ''
+                    continue
+
+                name = row[result_i] or default_result
+                batch = pending.get(name)
+                if batch is None:
+                    batch = pending[name] = ([], [])
+                batch[0].append(row[time_i])
+                batch[1].append(row[value_i])
+                if len(batch[0]) >= CSV_BATCH_ROWS:
+                    flush(name)
+        finally:
+            response.release_conn()
+
+        for name in pending:
+            flush(name)
+
+    def to_local(self, utc_times, values):
+        """Convert naive UTC timestamps to naive local wall-clock time"""
+        if len(utc_times) == 0:
+            return utc_times, values
+
+        # Without a DST change inside the window every point has the same UTC
+        # offset, so shifting the whole array by it is enough
+        start = utc_times.min()
+        if not self.offset_changes(start, utc_times.max()):
+            offset = self.utc_offset(start)
+            return utc_times + np.timedelta64(int(offset.total_seconds()), 's'), values
+
+        # Otherwise convert to the plotting timezone in one pass and drop the
+        # tzinfo: matplotlib plots naive datetime64 much faster
+        local_times = pd.DatetimeIndex(utc_times).tz_localize('UTC')
+        local_times = local_times.tz_convert(self.tz).tz_localize(None)
+        return local_times.to_numpy(dtype='datetime64[ns]'), values
+
+    def offset_changes(self, start, end):
+        """Tell whether the timezone changes its UTC offset between two naive UTC datetime64s"""
+        if self.tz_transitions is None:
+            # Unknown transitions, assume there may be one
+            return True
+        bounds = np.array([start, end]).astype('datetime64[us]')
+        before, after = np.searchsorted(self.tz_transitions, bounds, side='right')
+        return before != after
+
+    def utc_offset(self, utc_time):
+        """Return the plotting timezone's UTC offset at a naive UTC datetime64"""
+        return pd.Timestamp(utc_time, tz='UTC').tz_convert(self.tz).utcoffset()
+
+    @staticmethod
+    def empty_series():
+        """Return empty timestamp and value arrays with the plotting dtypes"""
+        return np.empty(0, dtype='datetime64[ns]'), np.empty(0, dtype=np.float64)
     
-    def create_graph(self, graph_config):
-        """Create a graph based on configuration"""
+    def create_graph(self, graph_config, data=None):
+        """Create a graph based on configuration
+
+        `data` is an already queried (timestamps, values) pair; when omitted
+        the graph's own query is run.
+        """
         print(f"Creating graph: {graph_config['name']}")
         
-        # Query data
-        timestamps, values = self.query_data(graph_config['query'])
+        # Query data unless it was fetched together with the other graphs
+        if data is None:
+            data = self.query_data(graph_config['query'], graph_config)
+        timestamps, values = data
         
-        if not timestamps or not values:
+        # Only nulls or non-numeric values leave nothing to plot
+        if len(timestamps) == 0 or np.isnan(values).all():
             print(f"No data found for {graph_config['name']}")
             return
+
+        output_path = os.path.join(
+            self.config['output']['directory'],
+            graph_config['filename']
+        )
+
+        # Skip rendering when neither the data nor the settings have changed
+        # since the existing image was written
+        use_cache = self.config['output'].get('cache', True)
+        hash_path = f"{output_path}.hash"
+        digest = self.graph_digest(graph_config, timestamps, values)
+        if use_cache and os.path.exists(output_path) and self.read_digest(hash_path) == digest:
+            print(f"Graph unchanged, keeping: {output_path}")
+            return
         
         # Set up the figure with specified size
         width = graph_config['size']['width'] / self.config['output']['dpi']
         height = graph_config['size']['height'] / self.config['output']['dpi']
         
-        fig, ax = plt.subplots(figsize=(width, height))
+        fig, ax = self.fig, self.ax
+        fig.set_size_inches(width, height)
+        ax.clear()
         
         # Get font sizes (with defaults)
         font_size = graph_config.get('font_size', {})
@@ -87,16 +477,18 @@ class GraphMaker:
         # the full interval starting at the timestamp (e.g., 00:00->00:15).
         bar_width_days = (15 * 60) / 86400  # default: 15 minutes
         if graph_type == 'bar' and len(timestamps) > 1:
-            deltas = []
-            for t1, t2 in zip(timestamps, timestamps[1:]):
-                dt = (t2 - t1).total_seconds()
-                if dt > 0:
-                    deltas.append(dt)
-            if deltas:
-                deltas.sort()
-                median_dt = deltas[len(deltas) // 2]
+            deltas = np.diff(timestamps.view('i8'))
+            deltas = deltas[deltas > 0]
+            if deltas.size:
+                median_dt = float(np.median(deltas)) / 1e9
                 bar_width_days = median_dt / 86400
         
+        # Long line series have many more points than pixel columns, so keep
+        # only the points that shape each column (M4 downsampling)
+        width_px = graph_config['size']['width']
+        if graph_type != 'bar' and len(timestamps) > 4 * width_px:
+            timestamps, values = _m4_downsample(timestamps, values, width_px)
+
         # Plot the data based on graph type
         if graph_type == 'bar':
             # Align bars to the interval start time (left edge at timestamp)
@@ -115,67 +507,122 @@ class GraphMaker:
         if 'ylabel' in graph_config and graph_config['ylabel']:
             ax.set_ylabel(graph_config['ylabel'], fontsize=axis_label_size)
         
-        # Format x-axis for dates (explicit timezone to avoid UTC offset)
-        try:
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M', tz=self.tz))
-            ax.xaxis.set_major_locator(mdates.HourLocator(interval=4, tz=self.tz))
-        except TypeError:
-            # Fallback for older matplotlib: plot naive local times
-            timestamps = [ts.replace(tzinfo=None) for ts in timestamps]
-            ax.clear()
-            if graph_type == 'bar':
-                ax.bar(timestamps, values, width=bar_width_days, align='edge')
-            else:
-                ax.plot(timestamps, values, linewidth=2)
-            ax.set_title(graph_config['title'], fontsize=title_size, fontweight='bold')
-            if 'xlabel' in graph_config and graph_config['xlabel']:
-                ax.set_xlabel(graph_config['xlabel'], fontsize=axis_label_size)
-            if 'ylabel' in graph_config and graph_config['ylabel']:
-                ax.set_ylabel(graph_config['ylabel'], fontsize=axis_label_size)
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
-            ax.xaxis.set_major_locator(mdates.HourLocator(interval=4))
-        plt.xticks(rotation=45, fontsize=tick_label_size)
-        plt.yticks(fontsize=tick_label_size)
+        # Format x-axis for dates (timestamps are already local wall-clock time)
+        ax.xaxis.set_major_formatter(self.date_formatter)
+        ax.xaxis.set_major_locator(self.date_locator)
+        ax.tick_params(axis='x', labelrotation=45, labelsize=tick_label_size)
+        ax.tick_params(axis='y', labelsize=tick_label_size)
         
         # Grid for better readability
         ax.grid(True, alpha=0.3, color='red')
         
         # Tight layout to prevent label cutoff
-        plt.tight_layout()
-        
-        # Save the graph
-        output_path = os.path.join(
-            self.config['output']['directory'],
-            graph_config['filename']
-        )
+        fig.tight_layout()
         
-        plt.savefig(
-            output_path,
-            format=self.config['output']['format'],
-            dpi=self.config['output']['dpi'],
-            bbox_inches='tight'
-        )
-        plt.close()
+        # Save the graph. The figure already has the exact display size and
+        # tight_layout() fitted the labels, so bbox_inches='tight' is not used:
+        # it needs an extra render pass and would change the image size.
+        output_format = self.config['output']['format'].lower()
+        if output_format in ('jpg', 'jpeg'):
+            # The figure dpi is the output dpi, so JPEGs can go straight to
+            # the canvas' Pillow writer without going through savefig()
+            with open(output_path, 'wb') as f:
+                fig.canvas.print_jpg(f, pil_kwargs={
+                    'quality': self.config['output'].get('quality', 85),
+                    'optimize': False,
+                    'progressive': False,
+                })
+        else:
+            save_kwargs = {}
+            if output_format in PIL_SAVE_OPTIONS:
+                save_kwargs['pil_kwargs'] = PIL_SAVE_OPTIONS[output_format]
+            fig.savefig(
+                output_path,
+                format=output_format,
+                dpi=self.config['output']['dpi'],
+                **save_kwargs
+            )
+        if use_cache:
+            with open(hash_path, 'w') as f:
+                f.write(digest)
         
         print(f"Graph saved to: {output_path}")
+
+    def graph_digest(self, graph_config, timestamps, values):
+        """Hash the data and settings that a rendered graph depends on"""
+        settings = {
+            'graph': graph_config,
+            'output': self.config['output'],
+            'timezone': self.config.get('timezone'),
+        }
+        h = hashlib.blake2b(digest_size=16)
+        h.update(yaml.safe_dump(settings, sort_keys=True).encode())
+        h.update(timestamps.tobytes())
+        h.update(values.tobytes())
+        return h.hexdigest()
+
+    @staticmethod
+    def read_digest(hash_path):
+        """Read the hash stored next to a rendered graph, if any"""
+        try:
+            with open(hash_path, 'r') as f:
+                return f.read().strip()
+        except OSError:
+            return None
     
+    def try_create_graph(self, graph_config, data=None):
+        """Create a graph, reporting errors instead of raising them"""
+        try:
+            self.create_graph(graph_config, data)
+        except Exception as e:
+            print(f"Error creating graph {graph_config['name']}: {e}")
+
     def generate_all_graphs(self):
         """Generate all graphs defined in config"""
-        print(f"Generating {len(self.config['graphs'])} graphs...")
-        
-        for graph_config in self.config['graphs']:
-            try:
-                self.create_graph(graph_config)
-            except Exception as e:
-                print(f"Error creating graph {graph_config['name']}: {e}")
+        graphs = self.config['graphs']
+        print(f"Generating {len(graphs)} graphs...")
+
+        # Fetch everything in one round trip; if the combined query fails,
+        # each graph falls back to running its own query
+        all_data = self.query_all(graphs) or [None] * len(graphs)
+
+        # Graphs are independent, so render them in parallel when possible.
+        # Each worker builds its own GraphMaker (and InfluxDB client) from the
+        # config file, as the client is not safe to share across processes.
+        workers = min(len(graphs), os.cpu_count() or 1)
+        if workers > 1:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(self.config_path,)
+            ) as executor:
+                list(executor.map(_create_graph_in_worker, graphs, all_data))
+        else:
+            for graph_config, data in zip(graphs, all_data):
+                self.try_create_graph(graph_config, data)
         
         print("All graphs generated!")
     
     def close(self):
-        """Close InfluxDB client connection"""
+        """Close InfluxDB client connection and release the figure"""
+        plt.close(self.fig)
         self.client.close()
 
 
+def _init_worker(config_path):
+    """Set up the GraphMaker used by a worker process"""
+    global _worker_graph_maker
+    _worker_graph_maker = GraphMaker(config_path)
+    # Worker processes skip atexit handlers, but run multiprocessing
+    # finalizers on exit, so release the client and figure there
+    Finalize(None, _worker_graph_maker.close, exitpriority=10)
+
+
+def _create_graph_in_worker(graph_config, data):
+    """Create one graph in a worker process"""
+    _worker_graph_maker.try_create_graph(graph_config, data)
+
+
 def main():
     """Main entry point"""
     graph_maker = GraphMaker()
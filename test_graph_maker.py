@@ -0,0 +1,231 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import graph_maker
+
+
+def make_series(n, start='2026-01-01T00:00', step_s=60):
+    timestamps = np.datetime64(start, 'ns') + np.arange(n) * np.timedelta64(step_s, 's')
+    rng = np.random.default_rng(0)
+    values = np.cumsum(rng.normal(size=n))
+    return timestamps, values
+
+
+@pytest.fixture
+def numpy_m4(monkeypatch):
+    """Force the plain numpy M4 implementation"""
+    monkeypatch.setattr(graph_maker, '_m4_jit', None)
+
+
+def test_m4_keeps_extremes_of_bins_with_nan(numpy_m4):
+    timestamps, values = make_series(20000)
+    values[::7] = np.nan
+    n_bins = 100
+
+    _, kept = graph_maker._m4_downsample(timestamps, values, n_bins)
+
+    # Every bin holds 200 points, so its min/max must survive downsampling
+    for chunk in values.reshape(n_bins, -1):
+        assert np.nanmin(chunk) in kept
+        assert np.nanmax(chunk) in kept
+
+
+@pytest.mark.skipif(graph_maker._m4_jit is None, reason='numba not installed')
+def test_m4_jit_matches_numpy(monkeypatch):
+    timestamps, values = make_series(20000, step_s=7)
+    values[::7] = np.nan
+    values[3000:3100] = np.nan  # a bin with nothing but NaN
+    n_bins = 640
+
+    jit_ts, jit_values = graph_maker._m4_downsample(timestamps, values, n_bins)
+    monkeypatch.setattr(graph_maker, '_m4_jit', None)
+    np_ts, np_values = graph_maker._m4_downsample(timestamps, values, n_bins)
+
+    np.testing.assert_array_equal(jit_ts, np_ts)
+    np.testing.assert_array_equal(jit_values, np_values)
+
+
+@pytest.fixture
+def make_maker(tmp_path):
+    """Build GraphMakers from a minimal config, optionally with a timezone"""
+    makers = []
+
+    def make(timezone='Europe/Helsinki'):
+        config = tmp_path / 'config.yaml'
+        config.write_text(
+            f'timezone: {timezone}\n'
+            'influxdb: {url: "http://localhost:8086", token: t, org: o}\n'
+            f'output: {{directory: "{tmp_path / "output"}", format: jpg, dpi: 100}}\n'
+            'graphs: []\n'
+        )
+        makers.append(graph_maker.GraphMaker(str(config)))
+        return makers[-1]
+
+    yield make
+    for graph_maker_ in makers:
+        graph_maker_.close()
+
+
+@pytest.fixture
+def maker(make_maker):
+    return make_maker()
+
+
+@pytest.mark.parametrize('start, n, step_s', [
+    ('2026-07-01T00:00', 96, 900),       # no transition
+    ('2026-03-28T12:00', 400, 900),      # spring transition
+    ('2024-01-01T00:00', 366, 86400),    # both transitions, same offset at the ends
+])
+def test_to_local_matches_tz_convert(maker, start, n, step_s):
+    timestamps = np.datetime64(start, 'ns') + np.arange(n) * np.timedelta64(step_s, 's')
+
+    local, _ = maker.to_local(timestamps, np.zeros(n))
+
+    expected = (pd.DatetimeIndex(timestamps).tz_localize('UTC')
+                .tz_convert(maker.tz).tz_localize(None).to_numpy())
+    np.testing.assert_array_equal(local, expected)
+
+
+@pytest.mark.parametrize('timezone, changes', [
+    ('Europe/Helsinki', True),
+    ('UTC', False),
+    ('Etc/GMT-3', False),
+])
+def test_offset_changes_by_zone_type(make_maker, timezone, changes):
+    maker = make_maker(timezone)
+    start = np.datetime64('2024-01-01T00:00', 'ns')
+    end = np.datetime64('2024-12-31T00:00', 'ns')
+
+    assert maker.offset_changes(start, end) == changes
+
+
+def test_to_local_converts_when_transitions_are_unknown(maker):
+    maker.tz_transitions = None
+    timestamps = np.datetime64('2024-01-01T12:00', 'ns') + np.arange(366) * np.timedelta64(1, 'D')
+
+    local, _ = maker.to_local(timestamps, np.zeros(366))
+
+    # 2024-07-15T12:00 UTC is 15:00 in Helsinki summer time
+    assert local[196] == np.datetime64('2024-07-15T15:00', 'ns')
+    assert maker.offset_changes(timestamps[0], timestamps[0])
+
+
+@pytest.mark.parametrize('query_range, every', [
+    ('range(start: -24h)', 135),
+    ('range(start: -24h, stop: now())', 135),
+    ('range(start: -24h, stop: -12h)', 67),
+    ('range(start: -1d12h, stop: -12h)', 135),
+    ('range(start: -12h, stop: -24h)', None),
+    ('range(start: -24h, stop: date.truncate(t: now(), unit: 1d))', None),
+    ('range(start: 2026-01-01T00:00:00Z)', None),
+])
+def test_aggregate_every_uses_range_span(maker, query_range, every):
+    graph_config = {'size': {'width': 640, 'height': 400}, 'aggregate': True}
+    query = f'from(bucket: "b")\n  |> {query_range}'
+
+    assert maker.aggregate_every(query, graph_config) == every
+
+
+def test_aggregate_is_opt_in(maker):
+    graph_config = {'size': {'width': 640, 'height': 400}}
+    query = 'from(bucket: "b")\n  |> range(start: -24h)'
+
+    assert maker.aggregate_every(query, graph_config) is None
+    assert 'aggregateWindow' not in maker.shape_query(query, graph_config)
+
+
+class FakeResponse(io.BytesIO):
+    """Stands in for the urllib3 response returned by query_raw()"""
+    auto_close = True
+    released = False
+
+    def release_conn(self):
+        self.released = True
+
+
+CSV_BODY = (
+    '#default,graph0,,,\r\n'
+    ',result,table,_time,_value\r\n'
+    ',,0,2026-01-01T00:00:00Z,1.5\r\n'
+    ',,0,2026-01-01T00:01:00Z,\r\n'
+    ',graph0,0,2026-01-01T00:02:00.5Z,3\r\n'
+    '\r\n'
+    '#default,graph1,,,\r\n'
+    ',result,table,_value,_time\r\n'
+    ',,0,true,2026-01-01T00:00:00Z\r\n'
+    ',graph1,1,false,2026-01-01T00:05:00Z\r\n'
+    '\r\n'
+)
+
+CSV_ERROR = (
+    '#default,,\r\n'
+    ',error,reference\r\n'
+    ',"bad field type, mean",\r\n'
+    '\r\n'
+)
+
+
+@pytest.fixture
+def fake_query_raw(maker):
+    """Make the maker's query_raw() return a canned CSV body"""
+    responses = []
+
+    def install(body):
+        def query_raw(query, dialect=None):
+            responses.append(FakeResponse(body.encode()))
+            return responses[-1]
+        maker.query_api.query_raw = query_raw
+        return responses
+    return install
+
+
+@pytest.mark.parametrize('batch_rows', [1, 10000])
+def test_read_series_routes_rows_by_result(maker, fake_query_raw, monkeypatch, batch_rows):
+    monkeypatch.setattr(graph_maker, 'CSV_BATCH_ROWS', batch_rows)
+    responses = fake_query_raw(CSV_BODY)
+    buffers = {'graph0': graph_maker.SeriesBuffer(), 'graph1': graph_maker.SeriesBuffer()}
+
+    maker.read_series('query', buffers)
+
+    times, values = buffers['graph0'].arrays()
+    np.testing.assert_array_equal(times, np.array([
+        '2026-01-01T00:00:00', '2026-01-01T00:01:00', '2026-01-01T00:02:00.5',
+    ], dtype='datetime64[ns]'))
+    np.testing.assert_array_equal(values, [1.5, np.nan, 3.0])
+
+    times, values = buffers['graph1'].arrays()
+    np.testing.assert_array_equal(times, np.array([
+        '2026-01-01T00:00:00', '2026-01-01T00:05:00',
+    ], dtype='datetime64[ns]'))
+    np.testing.assert_array_equal(values, [1.0, 0.0])
+    assert responses[0].released
+
+
+def test_read_series_raises_on_error_table(maker, fake_query_raw):
+    responses = fake_query_raw(CSV_BODY + CSV_ERROR)
+
+    with pytest.raises(RuntimeError, match='bad field type, mean'):
+        maker.read_series('query', {}, default=graph_maker.SeriesBuffer())
+    assert responses[0].released
+
+
+def test_query_all_returns_local_series_per_graph(maker, fake_query_raw):
+    fake_query_raw(CSV_BODY)
+    graphs = [{'query': 'from(bucket: "b")', 'size': {'width': 640}}] * 2
+
+    (times0, values0), (times1, values1) = maker.query_all(graphs)
+
+    # Europe/Helsinki is UTC+2 in January
+    assert times0[0] == np.datetime64('2026-01-01T02:00:00', 'ns')
+    assert len(values0) == 3
+    np.testing.assert_array_equal(values1, [1.0, 0.0])
+
+
+def test_query_all_reports_failure(maker, fake_query_raw):
+    fake_query_raw(CSV_ERROR)
+    graphs = [{'query': 'from(bucket: "b")', 'size': {'width': 640}}]
+
+    assert maker.query_all(graphs) is None